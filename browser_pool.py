@@ -0,0 +1,34 @@
+"""Process-wide Playwright browser shared by everything that takes screenshots."""
+
+import asyncio
+
+from playwright.async_api import async_playwright
+
+_lock = asyncio.Lock()
+_playwright = None
+_browser = None
+
+
+async def get_browser():
+    """Return the shared Chromium browser, launching it on first use."""
+    global _playwright, _browser
+
+    async with _lock:
+        if _browser is None or not _browser.is_connected():
+            if _playwright is None:
+                _playwright = await async_playwright().start()
+            _browser = await _playwright.chromium.launch()
+        return _browser
+
+
+async def close_browser():
+    """Close the shared browser and stop Playwright, if they were started."""
+    global _playwright, _browser
+
+    async with _lock:
+        if _browser is not None:
+            await _browser.close()
+            _browser = None
+        if _playwright is not None:
+            await _playwright.stop()
+            _playwright = None
@@ -1,11 +1,22 @@
 #!/usr/bin/env python3
 """Capture screenshots of all generated HTML files using Playwright."""
 
+import argparse
 import asyncio
+import functools
+import hashlib
+import json
+import os
+import struct
+import tempfile
 from pathlib import Path
-from playwright.async_api import async_playwright
 
-# Application dimensions (width x height) - matching input screenshots
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from browser_pool import close_browser, get_browser
+
+# Application dimensions (width x height) - matching input screenshots' aspect ratios.
+# Apps not listed here use the pixel size of input_screenshots/<app>.png.
 APP_DIMENSIONS = {
     "google_sheets": (2404, 1126),
     "jira": (2048, 1062),
@@ -14,30 +25,66 @@ APP_DIMENSIONS = {
     "vs_code": (1280, 640),
 }
 
-BASE_URL = "http://localhost:9876"
 OUTPUTS_DIR = Path("outputs")
+INPUT_SCREENSHOTS_DIR = Path("input_screenshots")
+
+# Options passed to page.screenshot. PNG is kept because index.html links .png files;
+# {"type": "jpeg", "quality": 92} encodes several times faster at a small fidelity cost.
+SCREENSHOT_OPTS = {"type": "png"}
+SCREENSHOT_SUFFIX = ".jpg" if SCREENSHOT_OPTS["type"] == "jpeg" else ".png"
+
+# Number of pages capturing in parallel
+CONCURRENCY = 6
+
+# Socket the --serve daemon listens on; plain runs hand their jobs to it when it is up.
+# Named after the resolved outputs directory so runs only reach a daemon working on
+# the same checkout.
+SOCKET_PATH = Path(tempfile.gettempdir()) / (
+    f"llm-ui-screenshots-{hashlib.sha1(str(OUTPUTS_DIR.resolve()).encode()).hexdigest()[:12]}.sock"
+)
+
+# Seconds a client waits on the daemon per queued job before giving up on it
+SERVER_TIMEOUT_PER_JOB = 30
+
+
+def png_size(path: Path) -> tuple[int, int]:
+    """Read a PNG's (width, height) from its IHDR header without decoding it."""
+    with open(path, "rb") as f:
+        header = f.read(24)
+    if header[:8] != b"\x89PNG\r\n\x1a\n" or header[12:16] != b"IHDR":
+        raise ValueError(f"Not a PNG file: {path}")
+    return struct.unpack(">II", header[16:24])
+
+
+@functools.lru_cache(maxsize=None)
+def app_dimensions(app_name: str) -> tuple[int, int]:
+    """Viewport for an app: APP_DIMENSIONS, else the size of its input screenshot."""
+    if app_name in APP_DIMENSIONS:
+        return APP_DIMENSIONS[app_name]
+    source = INPUT_SCREENSHOTS_DIR / f"{app_name}.png"
+    if source.exists():
+        return png_size(source)
+    return (1920, 1080)
 
 
 async def capture_screenshot(page, app_name: str, model_name: str):
     """Capture a screenshot for a specific app/model combination."""
     html_file = OUTPUTS_DIR / app_name / f"{model_name}.html"
-    png_file = OUTPUTS_DIR / app_name / f"{model_name}.png"
-
-    if not html_file.exists():
-        print(f"  Skipping {app_name}/{model_name} - HTML file not found")
-        return False
-
-    if png_file.exists():
-        print(f"  Skipping {app_name}/{model_name} - PNG already exists")
-        return True
+    screenshot_file = OUTPUTS_DIR / app_name / f"{model_name}{SCREENSHOT_SUFFIX}"
 
-    url = f"{BASE_URL}/outputs/{app_name}/{model_name}.html"
-    width, height = APP_DIMENSIONS.get(app_name, (1920, 1080))
+    # Load straight from disk; relative asset paths resolve against the file
+    url = html_file.resolve().as_uri()
 
     try:
-        await page.set_viewport_size({"width": width, "height": height})
-        await page.goto(url, wait_until="networkidle", timeout=30000)
-        await page.screenshot(path=str(png_file))
+        # The pages are static, so wait for the DOM and fonts rather than network idle
+        await page.goto(url, wait_until="domcontentloaded", timeout=10000)
+        try:
+            # Some pages pull remote images/fonts; a slow asset shouldn't cost the screenshot
+            await asyncio.wait_for(page.evaluate("() => document.fonts?.ready"), timeout=5)
+            await page.wait_for_function("document.readyState === 'complete'", timeout=5000)
+        except (asyncio.TimeoutError, PlaywrightTimeoutError):
+            print(f"  {app_name}/{model_name} still loading after 5s, capturing anyway")
+        await page.screenshot(path=str(screenshot_file), **SCREENSHOT_OPTS)
         print(f"  Captured {app_name}/{model_name}")
         return True
     except Exception as e:
@@ -45,28 +92,209 @@ async def capture_screenshot(page, app_name: str, model_name: str):
         return False
 
 
+async def worker(queue: asyncio.Queue):
+    """Capture queued jobs until a None sentinel, keeping one page per viewport size.
+
+    Each job is an (app_name, model_name, future) tuple; the future receives
+    the result of capture_screenshot. If the shared browser disconnects, the
+    next job relaunches it and the cached pages are rebuilt.
+    """
+    browser = None
+    contexts = {}
+    pages = {}
+
+    while (job := await queue.get()) is not None:
+        app_name, model_name, result = job
+
+        # Every job must be answered, or callers awaiting its future hang
+        try:
+            if browser is None or not browser.is_connected():
+                browser = await get_browser()
+                contexts = {}
+                pages = {}
+
+            dimensions = app_dimensions(app_name)
+            if dimensions not in pages or pages[dimensions].is_closed():
+                width, height = dimensions
+                contexts[dimensions] = await browser.new_context(
+                    viewport={"width": width, "height": height}
+                )
+                pages[dimensions] = await contexts[dimensions].new_page()
+
+            result.set_result(await capture_screenshot(pages[dimensions], app_name, model_name))
+        except Exception as e:
+            print(f"  Error capturing {app_name}/{model_name}: {e}")
+            result.set_result(False)
+
+    if browser is not None and browser.is_connected():
+        for context in contexts.values():
+            await context.close()
+
+
+def submit(queue: asyncio.Queue, combinations: list[tuple[str, str]]) -> list[asyncio.Future]:
+    """Queue combinations for the workers and return a future for each result."""
+    loop = asyncio.get_running_loop()
+    futures = []
+    for app_name, model_name in combinations:
+        future = loop.create_future()
+        queue.put_nowait((app_name, model_name, future))
+        futures.append(future)
+    return futures
+
+
+def parse_combinations(line: bytes) -> list[tuple[str, str]]:
+    """Parse a daemon request line into (app_name, model_name) pairs."""
+    pairs = json.loads(line)
+    if not isinstance(pairs, list):
+        raise ValueError("expected a list of [app_name, model_name] pairs")
+    for pair in pairs:
+        if not (isinstance(pair, list) and len(pair) == 2 and all(isinstance(v, str) for v in pair)):
+            raise ValueError(f"expected [app_name, model_name], got {pair!r}")
+    return [(app_name, model_name) for app_name, model_name in pairs]
+
+
+async def capture_all(combinations: list[tuple[str, str]]) -> int:
+    """Capture combinations in this process and return how many succeeded."""
+    # Queued app by app so each worker mostly reuses the same viewport's page
+    queue = asyncio.Queue()
+    futures = submit(queue, combinations)
+    for _ in range(CONCURRENCY):
+        queue.put_nowait(None)
+
+    try:
+        await asyncio.gather(*[worker(queue) for _ in range(CONCURRENCY)])
+    finally:
+        await close_browser()
+    return sum(future.result() for future in futures)
+
+
+async def serve():
+    """Keep a browser and its pages warm, capturing jobs sent over SOCKET_PATH.
+
+    Clients write one JSON line listing [app_name, model_name] pairs and get
+    back one JSON line with a result per pair, or {"error": ...} if the
+    request could not be parsed.
+    """
+    # Only replace the socket file if nothing is listening on it (a stale socket)
+    try:
+        _, writer = await asyncio.open_unix_connection(str(SOCKET_PATH))
+    except OSError:
+        SOCKET_PATH.unlink(missing_ok=True)
+    else:
+        writer.close()
+        raise SystemExit(f"Error: a screenshot daemon is already running on {SOCKET_PATH}")
+
+    # Launch up front so the first client doesn't pay for it
+    await get_browser()
+    queue = asyncio.Queue()
+    workers = [asyncio.create_task(worker(queue)) for _ in range(CONCURRENCY)]
+
+    async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                combinations = parse_combinations(await reader.readline())
+            except (ValueError, TypeError) as e:
+                reply = {"error": f"Invalid request: {e}"}
+            else:
+                reply = await asyncio.gather(*submit(queue, combinations))
+            writer.write(json.dumps(reply).encode("utf-8") + b"\n")
+            await writer.drain()
+        except ConnectionError:
+            # The client went away (e.g. it timed out); nothing left to answer
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_unix_server(handle_client, path=str(SOCKET_PATH))
+    print(f"Serving screenshots on {SOCKET_PATH} (Ctrl+C to stop)")
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for _ in workers:
+            queue.put_nowait(None)
+        await asyncio.gather(*workers)
+        await close_browser()
+        SOCKET_PATH.unlink(missing_ok=True)
+
+
+async def capture_via_server(combinations: list[tuple[str, str]]) -> int | None:
+    """Hand combinations to a running --serve daemon.
+
+    Returns how many succeeded, or None if no daemon is listening or it gave
+    no usable reply, in which case the caller captures in-process instead.
+    """
+    try:
+        reader, writer = await asyncio.open_unix_connection(str(SOCKET_PATH))
+    except OSError:
+        return None
+
+    try:
+        writer.write(json.dumps(combinations).encode("utf-8") + b"\n")
+        await writer.drain()
+        reply = await asyncio.wait_for(
+            reader.readline(), timeout=SERVER_TIMEOUT_PER_JOB * max(len(combinations), 1)
+        )
+        results = json.loads(reply)
+    except (OSError, ValueError, asyncio.TimeoutError) as e:
+        print(f"Daemon on {SOCKET_PATH} gave no usable reply ({e!r}), capturing locally")
+        return None
+    finally:
+        writer.close()
+
+    if not isinstance(results, list) or len(results) != len(combinations):
+        print(f"Daemon on {SOCKET_PATH} gave no usable reply ({results!r}), capturing locally")
+        return None
+    return sum(bool(ok) for ok in results)
+
+
 async def main():
-    # Get all HTML files (excluding old directory)
-    combinations = []
-    for app_name in APP_DIMENSIONS.keys():
-        app_dir = OUTPUTS_DIR / app_name
-        if app_dir.exists():
-            for html_file in app_dir.glob("*.html"):
-                model_name = html_file.stem
-                combinations.append((app_name, model_name))
-
-    print(f"Found {len(combinations)} HTML files to screenshot")
-
-    async with async_playwright() as p:
-        browser = await p.chromium.launch()
-        page = await browser.new_page()
-
-        success_count = 0
-        for app_name, model_name in sorted(combinations):
-            if await capture_screenshot(page, app_name, model_name):
-                success_count += 1
-
-        await browser.close()
+    parser = argparse.ArgumentParser(description="Capture screenshots of generated HTML files")
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run as a daemon that keeps the browser open between runs",
+    )
+    args = parser.parse_args()
+
+    if args.serve:
+        await serve()
+        return
+
+    # Apps with fixed dimensions plus any others that have an input screenshot
+    app_names = set(APP_DIMENSIONS) | {path.stem for path in INPUT_SCREENSHOTS_DIR.glob("*.png")}
+
+    # Get HTML files without a screenshot yet (excluding old directory), grouped by app.
+    # One directory listing per app replaces an exists() check per file.
+    html_count = 0
+    by_app: dict[str, list[str]] = {}
+    for app_name in app_names:
+        try:
+            with os.scandir(OUTPUTS_DIR / app_name) as entries:
+                names = [entry.name for entry in entries]
+        except FileNotFoundError:
+            continue
+        htmls = {name[:-5] for name in names if name.endswith(".html")}
+        screenshots = {
+            name[: -len(SCREENSHOT_SUFFIX)] for name in names if name.endswith(SCREENSHOT_SUFFIX)
+        }
+        html_count += len(htmls)
+        by_app[app_name] = sorted(htmls - screenshots)
+
+    combinations = [
+        (app_name, model_name)
+        for app_name, model_names in sorted(by_app.items())
+        for model_name in model_names
+    ]
+
+    print(f"Found {html_count} HTML files, {len(combinations)} without a screenshot")
+
+    success_count = await capture_via_server(combinations)
+    if success_count is None:
+        success_count = await capture_all(combinations)
+    else:
+        print(f"Captured by the daemon on {SOCKET_PATH}")
 
     print(f"\nCompleted: {success_count}/{len(combinations)} screenshots captured")
 
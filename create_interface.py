@@ -4,16 +4,76 @@ Script to call OpenRouter API with multimodal prompts to recreate application in
 """
 
 import argparse
-import base64
+import asyncio
+import functools
+import gzip
 import os
 import re
-import time
+import string
 from pathlib import Path
+from urllib.parse import quote
 
 import httpx
 from dotenv import load_dotenv
 
+try:
+    # SIMD-accelerated encoder; optional, the stdlib one gives identical output
+    from pybase64 import b64encode
+except ImportError:
+    from base64 import b64encode
 
+# orjson is optional; it serialises the multi-megabyte payload far faster than json
+try:
+    import orjson
+
+    def dumps_json(obj) -> bytes:
+        return orjson.dumps(obj)
+
+except ImportError:
+    import json
+
+    def dumps_json(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+# Client settings shared by every call in a run, so connections and TLS sessions are reused
+HTTP_TIMEOUT = httpx.Timeout(300.0, connect=10.0)
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=40, keepalive_expiry=30)
+
+# Bytes read per step when base64-encoding images; must be a multiple of 3
+_ENCODE_CHUNK_SIZE = 3 * 64 * 1024
+
+# HTML code block patterns tried in order by extract_html. Surrounding whitespace
+# is consumed outside the group, so matches need no further stripping.
+_HTML_BLOCK_PATTERNS = [
+    re.compile(r"```html\s*(.*?)\s*```", re.IGNORECASE | re.DOTALL),  # ```html ... ```
+    re.compile(r"```\s*(<!DOCTYPE.*?)\s*```", re.IGNORECASE | re.DOTALL),  # ``` <!DOCTYPE ... ```
+    re.compile(r"```\s*(<html.*?)\s*```", re.IGNORECASE | re.DOTALL),  # ``` <html ... ```
+]
+
+
+class _DropUnlisted(dict):
+    """str.translate table that deletes any character it has no entry for."""
+
+    def __missing__(self, codepoint: int) -> None:
+        return None
+
+
+# model_to_snake_case keeps [a-zA-Z0-9_], turns "." and "-" into "_" and drops the rest
+_SNAKE_CASE_TABLE = _DropUnlisted(
+    str.maketrans(string.ascii_letters + string.digits + "_.-", string.ascii_letters + string.digits + "___")
+)
+
+# Applications and their reference screenshots, used with --all_applications
+APPLICATIONS = {
+    "Microsoft Word": "input_screenshots/microsoft_word.png",
+    "Jira": "input_screenshots/jira.png",
+    "Spotify": "input_screenshots/spotify.png",
+    "VS Code": "input_screenshots/vs_code.png",
+    "Google Sheets": "input_screenshots/google_sheets.png",
+}
+
+
+@functools.lru_cache(maxsize=1)
 def get_api_key() -> str:
     """Get OpenRouter API key from environment variables."""
     # Load .env from the script's directory
@@ -32,11 +92,9 @@ def model_to_snake_case(model: str) -> str:
     """
     # Remove provider prefix (everything before /)
     name = model.split("/")[-1]
-    # Replace dots, hyphens with underscores
-    name = re.sub(r"[.\-]", "_", name)
-    # Remove any non-alphanumeric characters except underscores
-    name = re.sub(r"[^a-zA-Z0-9_]", "", name)
-    return name.lower()
+    # Replace dots, hyphens with underscores and remove any other
+    # non-alphanumeric characters, in a single pass
+    return name.translate(_SNAKE_CASE_TABLE).lower()
 
 
 def app_name_to_dir(app_name: str) -> str:
@@ -47,8 +105,12 @@ def app_name_to_dir(app_name: str) -> str:
     return app_name.lower().replace(" ", "_")
 
 
-def encode_image(image_path: str) -> tuple[str, str]:
-    """Encode image to base64 and determine media type."""
+def encode_image(image_path: str) -> str:
+    """Encode image as a base64 data URL.
+
+    The file is encoded in chunks straight into a pre-sized buffer, so the raw
+    bytes are never held in memory alongside the full base64 text.
+    """
     path = Path(image_path)
     suffix = path.suffix.lower()
 
@@ -62,45 +124,64 @@ def encode_image(image_path: str) -> tuple[str, str]:
 
     media_type = media_types.get(suffix, "image/png")
 
+    prefix = f"data:{media_type};base64,".encode("ascii")
+    size = path.stat().st_size
+    buffer = bytearray(len(prefix) + (size + 2) // 3 * 4)
+    buffer[: len(prefix)] = prefix
+
+    # Chunks are a multiple of 3 bytes so only the final one produces padding
+    chunk = bytearray(_ENCODE_CHUNK_SIZE)
+    view = memoryview(chunk)
+    offset = len(prefix)
     with open(path, "rb") as f:
-        data = base64.standard_b64encode(f.read()).decode("utf-8")
+        while n := f.readinto(chunk):
+            encoded = b64encode(view[:n])
+            buffer[offset : offset + len(encoded)] = encoded
+            offset += len(encoded)
 
-    return data, media_type
+    return str(memoryview(buffer)[:offset], "ascii")
 
 
 def extract_html(response_text: str) -> str:
     """Extract HTML code from response, stripping markdown code fences."""
+    # Stripped once here; every return below is either this or a slice of it
     text = response_text.strip()
 
-    # Try to find HTML in code blocks with closing fence
-    patterns = [
-        r"```html\s*([\s\S]*?)```",  # ```html ... ```
-        r"```\s*(<!DOCTYPE[\s\S]*?)```",  # ``` <!DOCTYPE ... ```
-        r"```\s*(<html[\s\S]*?)```",  # ``` <html ... ```
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-
-    # If no code block found, check if response is raw HTML
+    # Fast path: raw HTML needs no scanning at all
     if text.startswith(("<!DOCTYPE", "<html", "<HTML")):
         return text
 
+    # Fast path: the usual ```html fence found with plain substring searches, taken only
+    # when it is the first fence so earlier ```HTML blocks still win via the regex
+    start = text.find("```html")
+    if start >= 0 and start == text.find("```"):
+        end = text.find("```", start + 7)
+        if end >= 0:
+            return text[start + 7 : end].strip()
+
+    # Try to find HTML in code blocks with closing fence
+    for pattern in _HTML_BLOCK_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return match.group(1)
+
     # Last resort: return as-is
     return text
 
 
-def call_openrouter(
+async def acall_openrouter(
+    client: httpx.AsyncClient,
     api_key: str,
     model: str,
     app_name: str,
-    image_data: str,
-    media_type: str,
+    image_url: str,
+    compress: bool = False,
     max_retries: int = 3,
 ) -> str:
-    """Call OpenRouter API with the multimodal prompt."""
+    """Call OpenRouter API with the multimodal prompt.
+
+    With compress=True the request body is gzip-encoded before upload.
+    """
     url = "https://openrouter.ai/api/v1/chat/completions"
 
     headers = {
@@ -127,7 +208,7 @@ Return a single HTML file with embedded CSS and JavaScript ONLY. Do not return a
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:{media_type};base64,{image_data}",
+                            "url": image_url,
                         },
                     },
                 ],
@@ -135,82 +216,68 @@ Return a single HTML file with embedded CSS and JavaScript ONLY. Do not return a
         ],
     }
 
+    # Serialised once up front; the payload is dominated by the base64 image
+    body = dumps_json(payload)
+    if compress:
+        body = gzip.compress(body, compresslevel=1)
+        headers["Content-Encoding"] = "gzip"
+
     for attempt in range(max_retries):
         try:
-            with httpx.Client(timeout=300.0) as client:
-                response = client.post(url, headers=headers, json=payload)
+            response = await client.post(url, headers=headers, content=body)
 
-                if response.status_code == 429:
-                    # Rate limited - wait and retry
-                    wait_time = 2 ** attempt * 10  # Exponential backoff: 10, 20, 40 seconds
-                    print(f"  Rate limited. Waiting {wait_time}s before retry...")
-                    time.sleep(wait_time)
-                    continue
+            if response.status_code == 429:
+                # Rate limited - wait and retry
+                wait_time = 2 ** attempt * 10  # Exponential backoff: 10, 20, 40 seconds
+                print(f"  Rate limited. Waiting {wait_time}s before retry...")
+                await asyncio.sleep(wait_time)
+                continue
 
-                response.raise_for_status()
-                data = response.json()
+            response.raise_for_status()
+            data = response.json()
 
-                if "error" in data:
-                    raise ValueError(f"API error: {data['error']}")
+            if "error" in data:
+                raise ValueError(f"API error: {data['error']}")
 
-                content = data["choices"][0]["message"]["content"]
-                return content
+            content = data["choices"][0]["message"]["content"]
+            return content
 
         except httpx.TimeoutException:
             if attempt < max_retries - 1:
                 wait_time = 2 ** attempt * 5
                 print(f"  Timeout. Waiting {wait_time}s before retry...")
-                time.sleep(wait_time)
+                await asyncio.sleep(wait_time)
                 continue
             raise
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 429 and attempt < max_retries - 1:
                 wait_time = 2 ** attempt * 10
                 print(f"  Rate limited (HTTP 429). Waiting {wait_time}s before retry...")
-                time.sleep(wait_time)
+                await asyncio.sleep(wait_time)
                 continue
             raise
 
     raise RuntimeError(f"Failed after {max_retries} retries")
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Generate UI interface using OpenRouter LLM API"
-    )
-    parser.add_argument(
-        "--application_name",
-        required=True,
-        help="Name of the application (e.g., 'Microsoft Word')",
-    )
-    parser.add_argument(
-        "--image_path",
-        required=True,
-        help="Path to the screenshot file",
-    )
-    parser.add_argument(
-        "--model",
-        required=True,
-        help="OpenRouter model identifier (e.g., 'anthropic/claude-sonnet-4.5')",
-    )
-
-    args = parser.parse_args()
-
-    # Validate image exists
-    if not Path(args.image_path).exists():
-        print(f"Error: Image file not found: {args.image_path}")
-        return 1
-
-    # Get API key
-    try:
-        api_key = get_api_key()
-    except ValueError as e:
-        print(f"Error: {e}")
-        return 1
-
+async def generate_interface(
+    client: httpx.AsyncClient,
+    api_key: str,
+    application_name: str,
+    image_path: str,
+    model: str,
+    compress: bool = False,
+    image_base_url: str | None = None,
+) -> bool:
+    """Generate and save the interface for one application/model combination.
+
+    If image_base_url is given the screenshot is referenced at that public URL
+    prefix (joined with image_path, relative to the project root) rather than
+    inlined as base64.
+    """
     # Prepare output paths
-    app_dir = app_name_to_dir(args.application_name)
-    model_name = model_to_snake_case(args.model)
+    app_dir = app_name_to_dir(application_name)
+    model_name = model_to_snake_case(model)
     output_dir = Path("outputs") / app_dir
     output_dir.mkdir(parents=True, exist_ok=True)
     output_file = output_dir / f"{model_name}.html"
@@ -220,41 +287,162 @@ def main():
     raw_output_dir.mkdir(parents=True, exist_ok=True)
     raw_output_file = raw_output_dir / f"{model_name}.txt"
 
-    print(f"Processing: {args.application_name} with {args.model}")
-    print(f"  Image: {args.image_path}")
+    print(f"Processing: {application_name} with {model}")
+    print(f"  Image: {image_path}")
     print(f"  Output: {output_file}")
     print(f"  Raw output: {raw_output_file}")
 
     try:
-        # Encode image
-        image_data, media_type = encode_image(args.image_path)
+        # Reference the image by URL when it is published, otherwise encode it
+        if image_base_url:
+            image_url = f"{image_base_url.rstrip('/')}/{quote(Path(image_path).as_posix())}"
+        else:
+            image_url = encode_image(image_path)
 
         # Call API
-        print("  Calling OpenRouter API...")
-        response = call_openrouter(
+        print(f"  Calling OpenRouter API for {application_name} with {model}...")
+        response = await acall_openrouter(
+            client,
             api_key=api_key,
-            model=args.model,
-            app_name=args.application_name,
-            image_data=image_data,
-            media_type=media_type,
+            model=model,
+            app_name=application_name,
+            image_url=image_url,
+            compress=compress,
         )
 
         # Save raw output
-        raw_output_file.write_text(response)
+        raw_output_file.write_bytes(response.encode("utf-8"))
         print(f"  Raw response saved to {raw_output_file}")
 
         # Extract HTML
         html_content = extract_html(response)
 
         # Save output
-        output_file.write_text(html_content)
+        output_file.write_bytes(html_content.encode("utf-8"))
         print(f"  Success! Saved to {output_file}")
-        return 0
+        return True
 
     except Exception as e:
-        print(f"  Error with {args.model}: {e}")
+        print(f"  Error with {application_name} / {model}: {e}")
+        return False
+
+
+async def run_batch(
+    jobs: list[tuple[str, str, str]],
+    api_key: str,
+    concurrency: int = 8,
+    compress: bool = False,
+    image_base_url: str | None = None,
+) -> int:
+    """Run (application_name, image_path, model) jobs concurrently.
+
+    Returns the number of jobs that succeeded.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS) as client:
+
+        async def run(application_name: str, image_path: str, model: str) -> bool:
+            async with semaphore:
+                return await generate_interface(
+                    client, api_key, application_name, image_path, model, compress, image_base_url
+                )
+
+        results = await asyncio.gather(*[run(*job) for job in jobs])
+
+    return sum(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate UI interface using OpenRouter LLM API"
+    )
+    parser.add_argument(
+        "--application_name",
+        help="Name of the application (e.g., 'Microsoft Word')",
+    )
+    parser.add_argument(
+        "--image_path",
+        help="Path to the screenshot file",
+    )
+    parser.add_argument(
+        "--all_applications",
+        action="store_true",
+        help="Generate every application in APPLICATIONS instead of a single one",
+    )
+    parser.add_argument(
+        "--model",
+        required=True,
+        nargs="+",
+        help="One or more OpenRouter model identifiers (e.g., 'anthropic/claude-sonnet-4.5')",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of concurrent API calls (default: 8)",
+    )
+    parser.add_argument(
+        "--compress_request",
+        action="store_true",
+        help="Gzip the request body to cut upload size (the endpoint must accept Content-Encoding: gzip)",
+    )
+    parser.add_argument(
+        "--image_base_url",
+        help=(
+            "Public URL the project is served from (e.g., 'https://alechewitt.github.io/llm-ui-challenge'); "
+            "images are sent as <url>/<image_path> instead of base64"
+        ),
+    )
+
+    args = parser.parse_args()
+
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    if args.all_applications:
+        applications = list(APPLICATIONS.items())
+    elif args.application_name and args.image_path:
+        applications = [(args.application_name, args.image_path)]
+    else:
+        parser.error("--application_name and --image_path are required unless --all_applications is set")
+
+    # Validate images exist
+    for _, image_path in applications:
+        if not Path(image_path).exists():
+            print(f"Error: Image file not found: {image_path}")
+            return 1
+
+    # Published images must live inside the project so <url>/<image_path> points at them
+    if args.image_base_url:
+        script_dir = Path(__file__).resolve().parent
+        published = []
+        for application_name, image_path in applications:
+            try:
+                relative_path = Path(image_path).resolve().relative_to(script_dir)
+            except ValueError:
+                parser.error(f"--image_base_url needs images inside {script_dir}, got {image_path}")
+            published.append((application_name, relative_path.as_posix()))
+        applications = published
+
+    # Get API key
+    try:
+        api_key = get_api_key()
+    except ValueError as e:
+        print(f"Error: {e}")
         return 1
 
+    jobs = [
+        (application_name, image_path, model)
+        for model in args.model
+        for application_name, image_path in applications
+    ]
+
+    success_count = asyncio.run(run_batch(jobs, api_key, args.concurrency, args.compress_request, args.image_base_url))
+    if len(jobs) > 1:
+        print(f"\nCompleted: {success_count}/{len(jobs)} interfaces generated")
+    return 0 if success_count == len(jobs) else 1
+
 
 if __name__ == "__main__":
     exit(main())